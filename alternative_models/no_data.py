@@ -36,6 +36,7 @@ based on interactive, user-settable sliders.
 # Todo: figure out how to differentiate between fish and obstructions
 
 
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -128,7 +129,11 @@ class Fish(Agent):
         self.velocity += (self.cohere(neighbors) * self.cohere_factor +
                           self.separate(neighbors) * self.separate_factor +
                           self.match_velocity(neighbors) * self.match_factor) / 2
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
         new_pos = self.pos + self.velocity * self.speed
         self.model.space.move_agent(self, new_pos)
 
@@ -215,6 +220,7 @@ class ShoalModel(Model):
         assigned for each fish.
         Call data collectors for fish collective behaviour
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.initial_fish):
             x = random.random() * self.space.x_max
             y = random.random() * self.space.y_max
@@ -224,6 +230,7 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
 
     def make_obstructions(self):
         """
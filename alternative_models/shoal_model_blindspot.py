@@ -30,6 +30,7 @@ and agents with goal-, food-, or safety-seeking behaviour.
 A visualization of the model in an HTML object is in shoal_model_viz.py
 """
 
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -115,7 +116,11 @@ class Fish(Agent):
         self.velocity += (self.cohere(neighbors) * self.cohere_factor +
                           self.separate(neighbors) * self.separate_factor +
                           self.match_velocity(neighbors) * self.match_factor) / 2
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
         new_pos = self.pos + self.velocity * self.speed
         self.model.space.move_agent(self, new_pos)
 
@@ -160,6 +165,7 @@ class ShoalModel(Model):
         """
         Create N agents, with random positions and starting velocities.
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.population):
             x = random.random() * self.space.x_max
             y = random.random() * self.space.y_max
@@ -169,6 +175,8 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             model_reporters={"Polarization": polar,
@@ -179,5 +187,6 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
 
     # Todo: add slider for blind spot to viz file
@@ -26,15 +26,153 @@ object. The parameters for the visualization rely on a JavaScript canvas.
 """
 
 
-import random
+import math
 from mesa import Agent, Model
-from mesa.time import RandomActivation
 from mesa.datacollection import DataCollector
-from mesa.space import ContinuousSpace
+from numba import njit, prange
 
 from data_collectors import *
 
 
+@njit(parallel=True, fastmath=True, cache=True)
+def boid_kernel(pos, vel, indptr, indices, cohere, separate, match, separation,
+                new_vel):
+    """
+    Computes the new unit velocity of every fish from its neighbours within
+    the vision radius. The neighbours of fish i are indices[indptr[i]:indptr[i + 1]]
+    (compressed sparse row layout), which may include fish i itself. The new
+    velocities are written to the (N, 2) array new_vel, which is also returned.
+    """
+    sep2 = separation * separation
+    for i in prange(pos.shape[0]):
+        cohere_x = cohere_y = 0.0
+        separate_x = separate_y = 0.0
+        match_x = match_y = 0.0
+        count = 0
+        for k in range(indptr[i], indptr[i + 1]):
+            j = indices[k]
+            dx = pos[j, 0] - pos[i, 0]
+            dy = pos[j, 1] - pos[i, 1]
+            dist2 = dx * dx + dy * dy
+            if dist2 > 0:  # excludes itself
+                count += 1
+                cohere_x += dx
+                cohere_y += dy
+                match_x += vel[j, 0]
+                match_y += vel[j, 1]
+                if dist2 < sep2:
+                    separate_x -= dx
+                    separate_y -= dy
+        if count > 0:
+            cohere_x /= count
+            cohere_y /= count
+            match_x /= count
+            match_y /= count
+        vx = vel[i, 0] + (cohere_x * cohere + separate_x * separate + match_x * match) / 2
+        vy = vel[i, 1] + (cohere_y * cohere + separate_y * separate + match_y * match) / 2
+
+        # Make the velocity a unit vector
+        norm = np.sqrt(vx * vx + vy * vy)
+        if norm > 0:
+            vx /= norm
+            vy /= norm
+        new_vel[i, 0] = vx
+        new_vel[i, 1] = vy
+    return new_vel
+
+
+@njit(parallel=True, cache=True)
+def grid_neighbors(pos, x_min, y_min, cell_size, n_x, n_y, radius):
+    """
+    Finds the neighbours within radius of every fish by bucketing the fish
+    into a grid of n_x by n_y square cells, which must be at least as wide as
+    the radius, and only checking the 3x3 block of cells around each fish.
+    Returns the neighbours in compressed sparse row layout: the neighbours of
+    fish i (including itself) are indices[indptr[i]:indptr[i + 1]].
+    """
+    n = pos.shape[0]
+    cell_x = np.empty(n, np.int64)
+    cell_y = np.empty(n, np.int64)
+    for i in range(n):
+        cell_x[i] = min(max(int((pos[i, 0] - x_min) / cell_size), 0), n_x - 1)
+        cell_y[i] = min(max(int((pos[i, 1] - y_min) / cell_size), 0), n_y - 1)
+    cell = cell_x * n_y + cell_y
+
+    # The fish in cell c are order[start[c]:start[c + 1]]
+    order = np.argsort(cell)
+    start = np.zeros(n_x * n_y + 1, np.int64)
+    for i in range(n):
+        start[cell[i] + 1] += 1
+    start = np.cumsum(start)
+
+    # Count the neighbours of each fish, then fill in their indices
+    r2 = radius * radius
+    counts = np.zeros(n, np.int64)
+    for i in prange(n):
+        for gx in range(max(cell_x[i] - 1, 0), min(cell_x[i] + 2, n_x)):
+            for gy in range(max(cell_y[i] - 1, 0), min(cell_y[i] + 2, n_y)):
+                c = gx * n_y + gy
+                for k in range(start[c], start[c + 1]):
+                    j = order[k]
+                    dx = pos[j, 0] - pos[i, 0]
+                    dy = pos[j, 1] - pos[i, 1]
+                    if dx * dx + dy * dy <= r2:
+                        counts[i] += 1
+    indptr = np.zeros(n + 1, np.int64)
+    indptr[1:] = np.cumsum(counts)
+    indices = np.empty(indptr[n], np.int64)
+    for i in prange(n):
+        m = indptr[i]
+        for gx in range(max(cell_x[i] - 1, 0), min(cell_x[i] + 2, n_x)):
+            for gy in range(max(cell_y[i] - 1, 0), min(cell_y[i] + 2, n_y)):
+                c = gx * n_y + gy
+                for k in range(start[c], start[c + 1]):
+                    j = order[k]
+                    dx = pos[j, 0] - pos[i, 0]
+                    dy = pos[j, 1] - pos[i, 1]
+                    if dx * dx + dy * dy <= r2:
+                        indices[m] = j
+                        m += 1
+    return indptr, indices
+
+
+class SpatialHash:
+    """
+    Bounded, 2D space that finds neighbours with a uniform grid of square
+    cells (a spatial hash), replacing Mesa's ContinuousSpace. The grid is
+    rebuilt from the position array every time neighbours are requested, which
+    is linear in the number of fish, and each search only looks at the fish in
+    the 3x3 block of cells around a fish.
+    """
+    torus = False
+
+    def __init__(self, x_max, y_max, cell_size, x_min=0, y_min=0):
+        """
+        Create a new space. Args:
+            x_max, y_max: Maximum x and y coordinates for the space.
+            cell_size: Width of the grid cells. Must be at least the largest
+                       radius neighbours will be searched for in.
+            x_min, y_min: Minimum x and y coordinates for the space.
+        """
+        self.x_min = x_min
+        self.x_max = x_max
+        self.width = x_max - x_min
+        self.y_min = y_min
+        self.y_max = y_max
+        self.height = y_max - y_min
+        self.cell_size = cell_size
+        self.n_x = max(math.ceil(self.width / cell_size), 1)
+        self.n_y = max(math.ceil(self.height / cell_size), 1)
+
+    def get_neighbors(self, pos, radius):
+        """
+        Get the neighbours within radius of every position in the (N, 2)
+        array pos, as the (indptr, indices) arrays from grid_neighbors.
+        """
+        return grid_neighbors(pos, self.x_min, self.y_min, self.cell_size,
+                              self.n_x, self.n_y, radius)
+
+
 class Fish(Agent):
     """
     A Boid-style agent. Boids have a vision that defines the radius in which
@@ -42,87 +180,32 @@ class Fish(Agent):
     and their interactions with their neighbors - cohering and avoiding -
     define their movement. Separation is their desired minimum distance from
     any other Boid.
-    """
-    def __init__(self, unique_id, model, pos, speed, velocity, vision,
-                 separation, cohere=0.025, separate=0.25, match=0.04):
-        """
-        Create a new Boid (bird, fish) agent.
-        Args:
-            unique_id: Unique agent identifier.
-            pos: Starting position
-            speed: Distance to move per step.
-            velocity: numpy vector for the Boid's direction of movement.
-            vision: Radius to look around for nearby Boids.
-            separation: Minimum distance to maintain from other Boids.
-            cohere: the relative importance of matching neighbors' positions
-            separate: the relative importance of avoiding close neighbors
-            match: the relative importance of matching neighbors' headings
-        """
-        super().__init__(unique_id, model)
-        self.pos = np.array(pos)
-        self.speed = speed
-        self.velocity = velocity
-        self.vision = vision
-        self.separation = separation
-        self.cohere_factor = cohere
-        self.separate_factor = separate
-        self.match_factor = match
-        self.x_max = model.space.x_max
-        self.y_max = model.space.y_max
 
-    def cohere(self, neighbors):
-        """
-        Return the vector toward the centroid of the local neighbors.
-        """
-        cohere = np.zeros(2)
-        if neighbors:
-            for neighbor in neighbors:
-                cohere += self.model.space.get_heading(self.pos, neighbor.pos)
-            cohere /= len(neighbors)
-        return cohere
-
-    def separate(self, neighbors):
-        """
-        Return a vector away rom any neighbors or borders closer than the
-        separation distance determined in the model parameters.
-        """
-        # Todo: add borders to separation function
-        me = self.pos
-        them = (n.pos for n in neighbors)
-        borders = []
-        separate_vector = np.zeros(2)
-        for other in them:
-            if self.model.space.get_distance(me, other) < self.separation:
-                separate_vector -= self.model.space.get_heading(me, other)
-        return separate_vector
-
-    def match_velocity(self, neighbors):
+    The position and velocity of each fish are read from its row (its
+    unique_id) of the model's pos_arr and vel_arr arrays, and the vision,
+    separation, speed and drive factors are the model's, so that the whole
+    shoal can be moved at once in ShoalModel.update_all().
+    """
+    @property
+    def pos(self):
         """
-        Have Boids match the velocity of neighbors.
+        Current position of the fish, copied out of the model's array because
+        that array is reused for a later step.
         """
-        match_vector = np.zeros(2)
-        if neighbors:
-            for neighbor in neighbors:
-                match_vector += neighbor.velocity
-            match_vector /= len(neighbors)
-        return match_vector
+        return self.model.pos_arr[self.unique_id].copy()
 
-    def step(self):
-        """
-        Get the Boid's neighbors, compute the new vector, and move accordingly.
-        """
-        neighbors = self.model.space.get_neighbors(self.pos, self.vision, False)
-        self.velocity += (self.cohere(neighbors) * self.cohere_factor +
-                          self.separate(neighbors) * self.separate_factor +
-                          self.match_velocity(neighbors) * self.match_factor) / 2
-        self.velocity /= np.linalg.norm(self.velocity)
-        new_pos = self.pos + self.velocity * self.speed
-        self.model.space.move_agent(self, new_pos)
+    @property
+    def velocity(self):
+        """Current velocity (heading unit vector) of the fish, as a copy."""
+        return self.model.vel_arr[self.unique_id].copy()
 
 
 class ShoalModel(Model):
-    """ Shoal model class. Handles agent creation, placement and scheduling. """
-    # Todo: determine if there's anything that needs to be changed here for bounded space
+    """
+    Shoal model class. Handles agent creation and placement, and moves all of
+    the agents at the same time each step rather than one at a time through a
+    Mesa scheduler.
+    """
 
     def __init__(self,
                  population=10,
@@ -149,33 +232,68 @@ class ShoalModel(Model):
         self.vision = vision
         self.speed = speed
         self.separation = separation
-        self.schedule = RandomActivation(self)
-        self.space = ContinuousSpace(x_max=width, y_max=height,
-                                     torus=False,
-                                     x_min=0, y_min=0,
-                                     grid_width=100, grid_height=100)
+        # Cells as wide as the vision radius, but no smaller than needed for
+        # about one fish per cell so that tiny radii don't create huge grids
+        cell_size = max(vision, math.sqrt(width * height / population))
+        self.space = SpatialHash(x_max=width, y_max=height, cell_size=cell_size)
         self.factors = dict(cohere=cohere, separate=separate, match=match)
         self.make_agents()
         self.running = True
 
     def make_agents(self):
         """
-        Create N agents, with random positions and starting velocities.
+        Create N agents, with random positions and starting velocities. The
+        positions and velocities of all agents are stored as rows of two
+        (N, 2) single-precision arrays, which is plenty for a 2D space and
+        halves the memory read on every pass over them. A spare pair of
+        arrays is kept for the positions and velocities of the next step.
         """
+        size = (self.population, 2)
+        self.pos_arr = (np.random.random(size) *
+                        (self.space.x_max, self.space.y_max)).astype(np.float32)
+        self.vel_arr = (np.random.random(size) * 2 - 1).astype(np.float32)  # [-1.0 .. 1.0]
+        self.next_pos = np.empty_like(self.pos_arr)
+        self.next_vel = np.empty_like(self.vel_arr)
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.population):
-            x = random.random() * self.space.x_max
-            y = random.random() * self.space.y_max
-            pos = np.array((x, y))
-            velocity = np.random.random(2) * 2 - 1
-            fish = Fish(i, self, pos, self.speed, velocity, self.vision,
-                        self.separation, **self.factors)
-            self.space.place_agent(fish, pos)
-            self.schedule.add(fish)
+            fish = Fish(i, self)
+            self.fish_agents.append(fish)
 
         self.datacollector = DataCollector(
             model_reporters={"Polarization": polar,
                              "Nearest Neighbour Distance": nnd})
 
+    def update_all(self):
+        """
+        Compute the new vector of every fish at once and move them
+        accordingly. Each fish coheres with and matches the velocity of the
+        neighbours within its vision radius, and moves away from the neighbours
+        closer than the separation distance. Fish bounce off the edges of the
+        space. The new positions and velocities are calculated only from those
+        at the start of the step and written to the spare arrays, which are
+        then swapped with the current ones.
+        """
+        pos, vel = self.pos_arr, self.vel_arr
+        new_pos, new_vel = self.next_pos, self.next_vel
+
+        # Neighbours of every fish from the spatial hash, stored as one flat
+        # array of indices plus the offsets where each fish's neighbours start
+        indptr, indices = self.space.get_neighbors(pos, self.vision)
+        boid_kernel(pos, vel, indptr, indices,
+                    self.factors["cohere"], self.factors["separate"],
+                    self.factors["match"], self.separation, new_vel)
+
+        # Bounce off the walls on the X and Y axes
+        np.add(pos, new_vel * self.speed, out=new_pos)
+        new_vel[(new_pos[:, 0] < self.space.x_min) |
+                (new_pos[:, 0] >= self.space.x_max), 0] *= -1
+        new_vel[(new_pos[:, 1] < self.space.y_min) |
+                (new_pos[:, 1] >= self.space.y_max), 1] *= -1
+        np.add(pos, new_vel * self.speed, out=new_pos)
+
+        self.pos_arr, self.next_pos = new_pos, pos
+        self.vel_arr, self.next_vel = new_vel, vel
+
     def step(self):
         self.datacollector.collect(self)
-        self.schedule.step()
+        self.update_all()
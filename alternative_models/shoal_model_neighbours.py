@@ -23,6 +23,7 @@ number of neighbours to inform movements.
 """
 
 import numpy as np
+import math
 import random
 from scipy.spatial import KDTree
 from mesa import Agent, Model
@@ -127,7 +128,11 @@ class Fish(Agent):
         self.velocity += (self.cohere(neighbors) * self.cohere_factor +
                           self.separate(neighbors) * self.separate_factor +
                           self.match_velocity(neighbors) * self.match_factor) / 2
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
         new_pos = self.pos + self.velocity * self.speed
         self.model.space.move_agent(self, new_pos)
 
@@ -170,6 +175,7 @@ class ShoalModel(Model):
         Create N agents, with random positions and starting velocities.
         """
         # Todo: fix issue with "1 missing required positional argument: 'separation'
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.population):
             x = random.random() * self.space.x_max
             y = random.random() * self.space.y_max
@@ -178,6 +184,8 @@ class ShoalModel(Model):
             fish = Fish(i, self, pos, self.speed, velocity, self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             model_reporters={"Polarization": polar,
@@ -186,3 +194,4 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
@@ -21,6 +21,7 @@ object. The parameters for the visualization rely on a JavaScript canvas.
 """
 
 import numpy as np
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -94,7 +95,11 @@ class Fish(Agent):
         neighbors = self.model.space.get_neighbors(self.pos, self.vision, False)
         self.velocity += (self.cohere(neighbors) * self.cohere_factor +
                           self.separate(neighbors) * self.separate_factor) / 2
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
         new_pos = self.pos + self.velocity * self.speed
         self.model.space.move_agent(self, new_pos)
 
@@ -137,6 +142,7 @@ class ShoalModel(Model):
         """
         Create N agents, with random positions and starting velocities.
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.population):
             x = random.random() * self.space.x_max
             y = random.random() * self.space.y_max
@@ -146,6 +152,8 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             model_reporters={"Polarization": polar,
@@ -154,3 +162,4 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
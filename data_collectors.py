@@ -32,18 +32,44 @@ These are used in shoal_model.py and elsewhere.
 """
 
 import numpy as np
-import math
-import itertools
-from scipy.spatial import KDTree, ConvexHull
-from scipy.ndimage import center_of_mass
-from statsmodels.robust.scale import mad
+from scipy.spatial import cKDTree, ConvexHull
+from numba import njit
+
+
+# Scale for the median absolute deviation, the 75th percentile of the standard
+# normal distribution (scipy.stats.norm.ppf(0.75), as in statsmodels' mad).
+# Written out to avoid importing scipy.stats in every process.
+mad_scale = 0.6744897501960817
+
+
+@njit(cache=True)
+def mad(a):
+    """
+    Median absolute deviation of a 1D array from its median, divided by
+    mad_scale. Compiled with numba, and cached so that each new process (i.e.
+    every run on the cluster) doesn't have to compile it again.
+    """
+    return np.median(np.abs(a - np.median(a))) / mad_scale
+
+
+def update_fish_arrays(model):
+    """
+    Gathers the xy coordinates & velocities of the model's fish agents
+    (model.fish_agents) into the (N, 2) arrays model.pos_arr & model.vel_arr,
+    which all of the data collectors read. Models that move their fish as
+    agents call this once the fish are made and again every time they move, so
+    the arrays always match the fish. Models that keep their fish in these
+    arrays already (e.g. shoal_model_bounded.py) don't need it.
+    """
+    model.pos_arr = np.asarray([fish.pos for fish in model.fish_agents])
+    model.vel_arr = np.asarray([fish.velocity for fish in model.fish_agents])
 
 
 def test(model):
     """
     Data collector for testing whether the model is generating agents correctly.
     """
-    fish = [agent.pos for agent in model.schedule.agents if agent.tag == "fish"]
+    fish = [agent.pos for agent in model.fish_agents]
     obstruct = [agent.pos for agent in model.schedule.agents if agent.tag == "obstruct"]
     return fish, obstruct
 
@@ -55,18 +81,13 @@ def polar(model):
     To find the MAD, the x,y coordinates are converted to radians by finding
     the arc tangent of y/x. The function used pays attention to the sign of
     the input to make sure that the correct quadrant for the angle is determined.
+    The MAD is scaled as in statsmodels' mad (see mad above).
 
-    Collects velocity from ONLY the agents tagged as "fish".
+    Collects velocity from ONLY the fish agents (model.vel_arr).
     """
-    velocity_x = [agent.velocity[0] for agent in model.schedule.agents
-                  if agent.tag == "fish"]
-    velocity_y = [agent.velocity[1] for agent in model.schedule.agents
-                  if agent.tag == "fish"]
-    angle = []
-    for (y, x) in zip(velocity_y, velocity_x):
-        a = math.atan2(y, x)
-        angle.append(a)
-    return mad(np.asarray(angle), center=np.median)
+    velocity = model.vel_arr
+    angle = np.arctan2(velocity[:, 1], velocity[:, 0])
+    return mad(angle)
 
 
 def nnd(model):
@@ -76,18 +97,14 @@ def nnd(model):
     using a KDTree, a machine learning concept for clustering or
     compartmentalizing data. Right now, the 5 nearest neighbors are considered.
 
-    Collects position from ONLY the agents tagged as "fish".
+    Collects position from ONLY the fish agents (model.pos_arr).
     """
-    fish = np.asarray([agent.pos for agent in model.schedule.agents
-                       if agent.tag == "fish"])
-    fish_tree = KDTree(fish)
-    means = []
-    for me in fish:
-        neighbours = fish_tree.query(x=me, k=6)  # includes agent @ dist = 0
-        dist = list(neighbours[0])  # select dist from .query output
-        dist.pop(0)  # removes closest agent - itself @ dist = 0
-        means.append(sum(dist) / len(dist))
-    return sum(means) / len(means)
+    # The tree is only queried once, so skip the build-time work that only
+    # pays off over many queries
+    pos = model.pos_arr
+    fish_tree = cKDTree(pos, balanced_tree=False, compact_nodes=False)
+    dist, _ = fish_tree.query(pos, k=6)  # includes agent @ dist = 0
+    return dist[:, 1:].mean()  # removes closest agent - itself @ dist = 0
 
 
 def area(model):
@@ -96,67 +113,55 @@ def area(model):
     measure of shoal area. Uses the area variable from the scipy.spatial
     ConvexHull function.
 
-    Collects position from ONLY the agents tagged as "fish".
+    Collects position from ONLY the fish agents (model.pos_arr).
     """
     # Data needs to be a numpy array of floats - two columns (x,y)
-    pos_x = np.asarray([agent.pos[0] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    pos_y = np.asarray([agent.pos[1] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    return ConvexHull(np.column_stack((pos_x, pos_y))).area
+    return ConvexHull(model.pos_arr).area
 
 
 def centroid_dist(model):
     """
     Extracts xy coordinates for each agent, finds the centroid, and then
-    calculates the mean distance of each agent from the centroid.
+    calculates the mean distance of each agent from the centroid. As with
+    the space's get_distance, distances wrap around the edges of a toroidal
+    space.
 
-    Collects position from ONLY the agents tagged as "fish".
+    Collects position from ONLY the fish agents (model.pos_arr).
     """
-    pos_x = np.asarray([agent.pos[0] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    pos_y = np.asarray([agent.pos[1] for agent in model.schedule.agents
-                        if agent.tag == "fish"])
-    mean_x, mean_y = np.mean(pos_x), np.mean(pos_y)
-    centroid = (mean_x, mean_y)
-    pos = [agent.pos for agent in model.schedule.agents]
-    cent_dist = []
-    for p in pos:
-        dist = model.space.get_distance(p, centroid)
-        cent_dist = np.append(cent_dist, dist)
-    return np.mean(cent_dist)
+    pos = model.pos_arr
+    centroid = pos.mean(axis=0)
+    deltas = np.abs(pos - centroid)
+    if model.space.torus:
+        deltas = np.minimum(deltas, (model.space.width, model.space.height) - deltas)
+    return np.hypot(deltas[:, 0], deltas[:, 1]).mean()
 
 
 def positions(model):
-    """ Extracts xy coordinates for each agent tagged as "fish"."""
-    pos = [(agent.pos[0], 50-agent.pos[1]) for agent in model.schedule.agents
-           if agent.tag == "fish"]
-    pos = list(itertools.chain(*pos))  # creates lists of positions, rather than tuples
-    return pos
+    """
+    Extracts xy coordinates for each fish agent, with y inverted, as one list
+    of positions (x1, y1, x2, y2...), rather than tuples.
+    """
+    pos = np.array(model.pos_arr, dtype=float)  # copy of the positions
+    pos[:, 1] = 50 - pos[:, 1]
+    return pos.ravel().tolist()
 
 
 def heading(model):
     """
-    Extracts heading of each agent tagged as "fish". Heading is determined from
+    Extracts heading of each fish agent. Heading is determined from
     velocity in the agent creation, even though there's no movement element The
     velocity is a tuple - (x, y), here transformed into radians here..
     """
-    head = [agent.velocity for agent in model.schedule.agents
-            if agent.tag == "fish"]
-    degrees = [math.atan2(x, -y) for (x, y) in head]  # from x,y to radians with y inverted
-    return degrees
+    head = model.vel_arr
+    return np.arctan2(head[:, 0], -head[:, 1]).tolist()  # from x,y to radians with y inverted
 
 
 def center_mass(model):
     """
     Calculates the center of mass of the shoal. Same as the centroid when the
-    body has a uniform density. Calculated with the scipy.ndimage.center_of_mass
-    function.
+    body has a uniform density, so it is the mean of the fish positions.
     """
-    pos = np.asarray([agent.pos for agent in model.schedule.agents
-                      if agent.tag == "fish"])
-    center = center_of_mass(pos)
-    return np.asarray(center)
+    return model.pos_arr.mean(axis=0)
 
 
 def nn_perp_d(model):
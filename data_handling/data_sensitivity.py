@@ -17,15 +17,17 @@ all parameters: the one being tested, and the ones remaining fixed.
 The distributions and their approximate shape can be checked and visualized in
 the distributions.py file in the data_handling folder.
 
-At the moment, agent speed, vision radius, and separation distance are being
-tested in separate functions. These parameters are defined in shoal_model.py.
-In the future, other parameters can be added & tested.
+At the moment, agent speed, vision radius, separation distance, and the cohere,
+separate, and match factors are tested, one at a time, with the same function.
+These parameters are defined in shoal_model.py. In the future, other
+parameters can be added & tested by adding them to the dictionaries below.
 """
 
 from shoal_model import *
 import pandas as pd
 from scipy.stats import gamma
 import multiprocessing
+import random
 import time
 import os
 
@@ -62,211 +64,73 @@ steps = 300  # number of steps to run the model for each time
 
 burn_in = 200  # number of steps to exclude at the beginning as collective behaviour emerges
 
+# Values of each parameter while it is fixed, and the distribution of values
+# for each parameter while it is being tested
+fixed = dict(speed=speed_fixed, vision=vision_fixed, separation=sep_fixed,
+             cohere=cohere_fixed, separate=separate_fixed, match=match_fixed)
+dists = dict(speed=speed_dist, vision=vision_dist, separation=sep_dist,
+             cohere=cohere_dist, separate=separate_dist, match=match_dist)
 
-# RUN MODELS & COLLECT DATA ---------------------------------------------------
-
-def run_speed_model(speed):
-    """
-    Runs the shoal model for a certain number of steps with agent speed varying
-    while all other parameters are fixed. Returns a dataframe with the average
-    per run of all data collectors (average of all steps) and columns with the
-    parameter values for that run, including the varying & fixed parameters so
-    all dataframes can be stacked together.
-    """
-    speed_parameter = []
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=speed,
-                       vision=vision_fixed,
-                       separation=sep_fixed,
-                       cohere=cohere_fixed,
-                       separate=separate_fixed,
-                       match=match_fixed)
-    for step in range(steps):
-        model.step()  # run the model for certain number of steps
-        speed_parameter.append(speed)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data["speed"] = speed_parameter  # add parameter value column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T
-
-
-# Run the model as many times as there are parameter values, for # of steps in "s"
-# speed_data = pd.concat([run_speed_model(s, i) for i in speed_dist])
-
-
-def run_vision_model(vision):
-    """
-    Runs the shoal model for a certain number of steps with vision radius
-    varying while all other parameters are fixed. Returns a dataframe with the
-    average per run of all data collectors (average of all steps) and columns
-    with the parameter values for that run, including the varying & fixed
-    parameters so all dataframes can be stacked together.
-    """
-    vision_parameter = []
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=speed_fixed,
-                       vision=vision,
-                       separation=sep_fixed,
-                       cohere=cohere_fixed,
-                       separate=separate_fixed,
-                       match=match_fixed)
-    for step in range(steps):
-        model.step()  # run the model for certain number of steps
-        vision_parameter.append(vision)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe()  # retrieve data from model
-    data["vision"] = vision_parameter  # add vision column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+# Names of the data collectors & the exported file for each parameter
+collectors = ["Polarization", "Nearest Neighbour Distance", "Shoal Area",
+              "Mean Distance from Centroid"]
+files = dict(speed="var-speed100.csv", vision="var-vision100.csv",
+             separation="var-sep100.csv", cohere="var-cohere100.csv",
+             separate="var-separate100.csv", match="var-match100.csv")
 
 
-# Run the model as many times as there are parameter values, for # of steps in "s"
-# vision_data = pd.concat([run_vision_model(s, i) for i in vision_dist])
-
-
-def run_sep_model(separation):
-    """
-    Runs the shoal model for a certain number of steps with separation distance
-    varying while all other parameters are fixed. Returns a dataframe with the
-    average per run of all data collectors (average of all steps) and columns
-    with the parameter values for that run, including the varying & fixed
-    parameters so all dataframes can be stacked together.
-    """
-    sep_parameter = []
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=speed_fixed,
-                       vision=vision_fixed,
-                       separation=separation,
-                       cohere=cohere_fixed,
-                       separate=separate_fixed,
-                       match=match_fixed)
-    for step in range(steps):
-        model.step()  # run the model for certain number of steps
-        sep_parameter.append(separation)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["separation"] = sep_parameter  # add separation column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
-
-# Run the model as many times as there are parameter values, for # of steps in "s"
-# sep_data = pd.concat([run_sep_model(s, i) for i in sep_dist])
-
-
-def run_cohere_model(cohere):
-    """
-    Runs the shoal model for a certain number of steps with coherence vector
-    varying while all other parameters are fixed. Returns a dataframe with the
-    average per run of all data collectors (average of all steps) and columns
-    with the parameter values for that run, including the varying & fixed
-    parameters so all dataframes can be stacked together.
-    """
-    cohere_parameter = []
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=speed_fixed,
-                       vision=vision_fixed,
-                       separation=sep_fixed,
-                       cohere=cohere,
-                       separate=separate_fixed,
-                       match=match_fixed)
-    for step in range(steps):
-        model.step()  # run the model for certain number of steps
-        cohere_parameter.append(cohere)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["cohere"] = cohere_parameter  # add cohere column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
-
-
-def run_separate_model(separate):
-    """
-    Runs the shoal model for a certain number of steps with separate vector
-    varying while all other parameters are fixed. Returns a dataframe with the
-    average per run of all data collectors (average of all steps) and columns
-    with the parameter values for that run, including the varying & fixed
-    parameters so all dataframes can be stacked together.
-    """
-    separate_parameter = []
-    model = ShoalModel(n_fish=20,
-                       width=100,
-                       height=100,
-                       speed=speed_fixed,
-                       vision=vision_fixed,
-                       separation=sep_fixed,
-                       cohere=cohere_fixed,
-                       separate=separate,
-                       match=match_fixed)
-    for step in range(steps):
-        model.step()  # run the model for certain number of steps
-        separate_parameter.append(separate)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["separate"] = separate_parameter  # add separate column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
-
+# RUN MODELS & COLLECT DATA ---------------------------------------------------
 
-def run_match_model(match):
+def run_model(parameter, value, seed):
     """
-    Runs the shoal model for a certain number of steps with separate vector
-    varying while all other parameters are fixed. Returns a dataframe with the
-    average per run of all data collectors (average of all steps) and columns
-    with the parameter values for that run, including the varying & fixed
-    parameters so all dataframes can be stacked together.
+    Runs the shoal model for a certain number of steps with one parameter
+    (speed, vision, separation, cohere, separate or match) set to the given
+    value while all other parameters are fixed. Returns the average per run of
+    all data collectors (average of all steps after the burn-in), kept as a
+    running total while the model runs rather than from a dataframe of every
+    step.
+
+    The random number generators are seeded for each run: worker processes
+    are forked with a copy of the parent's random state, so without a seed the
+    runs in each worker would start from the same fish positions & velocities.
     """
-    match_parameter = []
+    random.seed(seed)  # starting positions
+    np.random.seed(seed)  # starting velocities
     model = ShoalModel(n_fish=20,
                        width=100,
                        height=100,
-                       speed=speed_fixed,
-                       vision=vision_fixed,
-                       separation=sep_fixed,
-                       cohere=cohere_fixed,
-                       separate=separate_fixed,
-                       match=match)
+                       **dict(fixed, **{parameter: value}))
+    model.reset_randomizer(seed)  # order the fish are activated in
+    totals = np.zeros(len(collectors))
     for step in range(steps):
         model.step()  # run the model for certain number of steps
-        match_parameter.append(match)  # create list of parameter values tested
-    data = model.datacollector.get_model_vars_dataframe() # retrieve data from model
-    data["match"] = match_parameter  # add match column
-    data_trim = data.iloc[burn_in:, ]  # remove early runs
-    return pd.DataFrame(data_trim.mean(axis=0)).T  # return means of all columns & transposed
+        if step >= burn_in:  # exclude early runs
+            # data collected at the start of this step
+            totals += [model.datacollector.model_vars[c][-1] for c in collectors]
+    return totals / (steps - burn_in)  # means of all data collectors
 
 
 # MULTIPROCESSING -------------------------------------------------------------
 # Runs the model for as many times as is in the distribution of values above,
-# using multiple cores. Number of processes is set to 10, but can be reduced
-# if other work needs to be done on the computer that requires CPU space.
-# Also prints how long it took, for reference.
+# using one process per core. The runs for all parameters are handed to the
+# pool at once, so no core sits idle waiting for the last runs of one
+# parameter before the next one starts. Each run gets its own seed, drawn
+# from fresh entropy, so every run starts from different fish. Also prints how
+# long it took, for reference. The means from every run are stored in one array, and a dataframe
+# for each parameter is only created for the export.
 
 if __name__ == '__main__':
     start = time.time()
-    p = multiprocessing.Pool(processes=10)  # 10 processes seems to be a sweet spot
-    speed_data = p.map(run_speed_model, [i for i in speed_dist])
-    vision_data = p.map(run_vision_model, [i for i in vision_dist])
-    sep_data = p.map(run_sep_model, [i for i in sep_dist])
-    cohere_data = p.map(run_cohere_model, [i for i in cohere_dist])
-    separate_data = p.map(run_separate_model, [i for i in separate_dist])
-    match_data = p.map(run_match_model, [i for i in match_dist])
-    p.close()
-    speed_data = pd.concat(speed_data)  # change into data format for export
-    vision_data = pd.concat(vision_data)
-    sep_data = pd.concat(sep_data)
-    cohere_data = pd.concat(cohere_data)
-    separate_data = pd.concat(separate_data)
-    match_data = pd.concat(match_data)
+    tasks = [(parameter, v) for parameter in dists for v in dists[parameter]]
+    seeds = np.random.SeedSequence().generate_state(len(tasks)).tolist()
+    tasks = [task + (seed,) for task, seed in zip(tasks, seeds)]
+    with multiprocessing.Pool() as p:
+        results = np.asarray(p.starmap(run_model, tasks), dtype=np.float32)
+    results = results.reshape((len(dists), runs, len(collectors)))
     print("Time taken = {} minutes".format((time.time() - start)/60))  # print how long it took
 
-# EXPORT DATA -----------------------------------------------------------------
-
-speed_data.to_csv(os.path.join(path, r"var-speed100.csv"), index=False)
-vision_data.to_csv(os.path.join(path, r"var-vision100.csv"), index=False)
-sep_data.to_csv(os.path.join(path, r"var-sep100.csv"), index=False)
-cohere_data.to_csv(os.path.join(path, r"var-cohere100.csv"), index=False)
-separate_data.to_csv(os.path.join(path, r"var-separate100.csv"), index=False)
-match_data.to_csv(os.path.join(path, r"var-match100.csv"), index=False)
+    # EXPORT DATA -------------------------------------------------------------
+    for i, parameter in enumerate(dists):
+        data = pd.DataFrame(results[i], columns=collectors)
+        data[parameter] = dists[parameter]  # add parameter value column
+        data.to_csv(os.path.join(path, files[parameter]), index=False)
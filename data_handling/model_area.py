@@ -15,7 +15,7 @@ from mesa.datacollection import DataCollector
 from mesa.space import ContinuousSpace
 
 from shoal_model import Fish, Obstruct
-from data_collectors import area
+from data_collectors import area, update_fish_arrays
 
 
 class ShoalModel(Model):
@@ -65,6 +65,7 @@ class ShoalModel(Model):
         assigned for each fish.
         Call data collectors for fish collective behaviour
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.initial_fish):
             x = random.random() * self.space.x_max
             y = random.random() * self.space.y_max
@@ -74,6 +75,8 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(model_reporters={"Shoal Area": area})
 
@@ -106,6 +109,7 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
 
 
 path = "/Users/user/Desktop/Local/Mackerel/Mackerel Data"
@@ -1,8 +1,10 @@
 """
 This file is for testing the effect of different parameter values on the output
 from the data collectors, when running on the ICHEC cluster. In this script,
-a value (prior) for speed is passed in from a defined gamma distribution (from
-create_priors.py & sep_priors.txt).
+one or more values (priors) for speed are passed in from a defined gamma
+distribution (from create_priors.py & sep_priors.txt). Passing several priors,
+separated by spaces, runs them all in the same process so the start-up cost of
+Python, numpy & Mesa is only paid once, with one row of output per prior.
 """
 
 from shoal_model import *
@@ -45,7 +47,9 @@ def run_speed_model(prior):
 
 
 # Run the model as many times as there are parameter values
-speed_data = run_speed_model(float(sys.argv[1]))
+priors = [float(prior) for prior in " ".join(sys.argv[1:]).split()]
+speed_data = pd.concat([run_speed_model(prior) for prior in priors],
+                       ignore_index=True)
 
 # Re-name columns so all data will print & index with unique values for R.
 speed_data.columns = ["cent_min", "nnd_min", "polar_min", "area_min",
@@ -56,5 +60,6 @@ speed_data.columns = ["cent_min", "nnd_min", "polar_min", "area_min",
 
 pd.set_option("display.max_columns", None)  # display all columns
 pd.set_option("display.width", 1000)  # stop print from splitting columns on to new lines
+pd.set_option("display.max_rows", None)  # print every prior's row instead of truncating
 
 print(speed_data)  # printing makes the data accessible from the cluster.
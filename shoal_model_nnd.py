@@ -31,6 +31,7 @@ based on interactive, user-settable sliders.
 # Todo: figure out how to turn off the torus feature for actual bounded space.
 
 
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -147,7 +148,11 @@ class Fish(Agent):
                           self.match_velocity(neighbors) * self.match_factor) / 2
 
         # Make self.velocity a unit vector
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
 
         # Get the new position and make sure it bounces off the walls
         new_position = self.avoid_boundaries()
@@ -234,6 +239,7 @@ class ShoalModel_nnd(Model):
         assigned for each fish.
         Call data collectors for fish collective behaviour
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.n_fish):
             x = random.randrange(2, (self.space.x_max - 1))
             y = random.randrange(2, (self.space.y_max - 1))
@@ -243,6 +249,8 @@ class ShoalModel_nnd(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             # model_reporters={"test": test})
@@ -278,3 +286,4 @@ class ShoalModel_nnd(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
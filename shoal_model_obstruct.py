@@ -9,6 +9,7 @@ This is a version of the shoaling model (shoal_model.py). The changes are:
 """
 
 
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -125,7 +126,11 @@ class Fish(Agent):
                           self.match_velocity(neighbors) * self.match_factor) / 2
 
         # Make self.velocity a unit vector
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
 
         # Get the new position and make sure it bounces off the walls
         new_position = self.avoid_boundaries()
@@ -212,6 +217,7 @@ class ShoalModel(Model):
         assigned for each fish.
         Call data collectors for fish collective behaviour
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.n_fish):
             # Todo: change these ranges to move agents around obstructions
             # Move agents below thermocline
@@ -228,6 +234,8 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             # model_reporters={"test": test})
@@ -263,3 +271,4 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved
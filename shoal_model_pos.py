@@ -32,6 +32,7 @@ based on interactive, user-settable sliders.
 """
 
 
+import math
 import random
 from mesa import Agent, Model
 from mesa.time import RandomActivation
@@ -148,7 +149,11 @@ class Fish(Agent):
                           self.match_velocity(neighbors) * self.match_factor) / 2
 
         # Make self.velocity a unit vector
-        self.velocity /= np.linalg.norm(self.velocity)
+        length = math.hypot(self.velocity[0], self.velocity[1])
+        if length > 0:
+            inv_length = 1.0 / length
+            self.velocity[0] *= inv_length
+            self.velocity[1] *= inv_length
 
         # Get the new position and make sure it bounces off the walls
         new_position = self.avoid_boundaries()
@@ -236,6 +241,7 @@ class ShoalModel(Model):
 
         Call data collectors for position and heading of each fish at each data step.
         """
+        self.fish_agents = []  # fish only, for the data collectors
         for i in range(self.n_fish):
             x = random.randrange(2, (self.space.x_max - 2))
             y = random.randrange(2, (self.space.y_max - 2))
@@ -245,6 +251,8 @@ class ShoalModel(Model):
                         self.separation, **self.factors)
             self.space.place_agent(fish, pos)
             self.schedule.add(fish)
+            self.fish_agents.append(fish)
+        update_fish_arrays(self)  # positions & velocities for the data collectors
 
         self.datacollector = DataCollector(
             # model_reporters={"test": test})
@@ -277,3 +285,4 @@ class ShoalModel(Model):
     def step(self):
         self.datacollector.collect(self)
         self.schedule.step()
+        update_fish_arrays(self)  # the fish have moved